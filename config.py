@@ -4,10 +4,65 @@ Loads settings from config.yaml and API keys from .env file
 """
 
 import os
+import json
+import functools
+import jsonschema
+import orjson
 import yaml
 from pathlib import Path
 from dotenv import load_dotenv
 
+# Prefer the libyaml C bindings when PyYAML was built with them
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+# .env only needs to be read once per process
+_DOTENV_LOADED = False
+
+# Shipped alongside config.yaml
+SCHEMA_PATH = Path(__file__).with_name("config.schema.json")
+
+
+@functools.lru_cache(maxsize=8)
+def _load_yaml_cached(path: str, mtime_ns: int, size: int) -> dict:
+    """
+    Parse a YAML file, memoized on (path, mtime, size).
+    Editing the file changes its mtime, which invalidates the cached entry.
+    
+    Across processes the parsed dict is kept in a JSON sidecar next to the
+    YAML file, which is much cheaper to load than re-parsing the YAML. The
+    sidecar records the mtime and size it was built from and is only used
+    on an exact match, so a YAML file replaced by an older copy is re-read.
+    """
+    cache_file = Path(path).with_suffix('.json.cache')
+    source = [mtime_ns, size]
+    try:
+        cached = orjson.loads(cache_file.read_bytes())
+        if isinstance(cached, dict) and cached.get('source') == source:
+            return cached['config']
+    except (OSError, orjson.JSONDecodeError):
+        pass
+    
+    with open(path, 'r') as f:
+        config_data = yaml.load(f, Loader=_Loader) or {}
+    
+    # Sidecar is best-effort: read-only dirs or non-JSON values just skip it
+    try:
+        cache_file.write_bytes(orjson.dumps({'source': source, 'config': config_data}))
+    except (OSError, TypeError):
+        pass
+    
+    return config_data
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled_validator(schema_path: str) -> jsonschema.Draft202012Validator:
+    """Build the JSON Schema validator once per schema file."""
+    schema = json.loads(Path(schema_path).read_text(encoding='utf-8'))
+    return jsonschema.Draft202012Validator(schema)
+
 
 class Config:
     """
@@ -36,13 +91,23 @@ class Config:
                 "Please create config.yaml in the project root."
             )
         
-        with open(config_file, 'r') as f:
-            config_data = yaml.safe_load(f)
+        file_stat = config_file.stat()
+        config_data = _load_yaml_cached(str(config_file), file_stat.st_mtime_ns, file_stat.st_size)
+        
+        # Fail fast on wrongly-typed settings instead of deep inside the pipeline
+        try:
+            _compiled_validator(str(SCHEMA_PATH)).validate(config_data)
+        except jsonschema.ValidationError as e:
+            location = "/".join(str(p) for p in e.absolute_path) or "<root>"
+            raise ValueError(
+                f"Invalid config in {self.config_path} at '{location}': {e.message}"
+            ) from e
         
         # Paths
         paths = config_data.get('paths', {})
         self.KNOWLEDGE_BASE_PATH = paths.get('knowledge_base', 'knowledge_base')
         self.CHROMA_PERSIST_DIR = paths.get('chroma_persist_dir', './chroma_db')
+        self.FAISS_PERSIST_DIR = paths.get('faiss_persist_dir', './faiss_db')
         self.COLLECTION_NAME = paths.get('collection_name', 'techcorp_docs')
         
         # Models
@@ -55,14 +120,53 @@ class Config:
         self.MAX_TOKENS = models.get('max_tokens', 1024)
         
         self.ACTIVE_PROVIDER = config_data.get('active_provider', 'gemini')
+        # Gemini HTTP connection pool
+        http = config_data.get('http', {})
+        self.HTTP_TIMEOUT_SECONDS = http.get('timeout_seconds', 30)
+        self.HTTP_MAX_CONNECTIONS = http.get('max_connections', 64)
+        self.HTTP_MAX_KEEPALIVE = http.get('max_keepalive_connections', 32)
+        self.HTTP_KEEPALIVE_EXPIRY = http.get('keepalive_expiry_seconds', 60)
+        self.HTTP2_ENABLED = http.get('http2', True)
+        
         # Retrieval
         retrieval = config_data.get('retrieval', {})
         self.RETRIEVAL_TOP_K = retrieval.get('top_k', 5)
         self.SIMILARITY_SEARCH_K = retrieval.get('similarity_search_k', 10)
+        self.HNSW_CONSTRUCTION_EF = retrieval.get('hnsw_construction_ef', 200)
+        self.HNSW_M = retrieval.get('hnsw_m', 16)
+        self.HNSW_SPACE = retrieval.get('hnsw_space', 'cosine')
+        self.HNSW_SEARCH_EF = retrieval.get('hnsw_search_ef', 64)
+        self.VECTOR_BACKEND = retrieval.get('vector_backend', 'chroma')
+        self.FAISS_QUANTIZATION = retrieval.get('faiss_quantization', 'none')
+        self.MAX_CONCURRENT_LLM = retrieval.get('max_concurrent_llm', 4)
+        self.WARMUP_ON_INIT = retrieval.get('warmup_on_init', False)
+        self.INTENT_THINKING_BUDGET = retrieval.get('intent_thinking_budget', 0)
+        
+        # Document processing
+        processing = config_data.get('processing', {})
+        self.EMBEDDING_BATCH_SIZE = processing.get('embedding_batch_size', 100)
+        self.VERBOSE = processing.get('verbose', True)
+        self.LOG_LEVEL = processing.get('log_level', 'WARNING')
+        
+        # Semantic query cache
+        cache = config_data.get('cache', {})
+        self.CACHE_ENABLED = cache.get('enabled', True)
+        self.CACHE_SIM_THRESHOLD = cache.get('similarity_threshold', 0.95)
+        self.CACHE_MAX_SIZE = cache.get('max_size', 256)
+        self.CACHE_TTL_SECONDS = cache.get('ttl_seconds', 3600)
+        self.CACHE_PATH = cache.get('path', 'semantic_cache')
+        self.INTENT_CACHE_SIZE = cache.get('intent_cache_size', 1024)
+        self.INTENT_CACHE_PATH = cache.get('intent_cache_path', '~/.cache/rag_engine/intent.json')
+        self.PROMPT_CACHE_ENABLED = cache.get('prompt_cache_enabled', False)
+        self.PROMPT_CACHE_TTL_SECONDS = cache.get('prompt_cache_ttl_seconds', 3600)
     
     def _load_env(self):
         """Load environment variables from .env file."""
-        load_dotenv()
+        global _DOTENV_LOADED
+        if not _DOTENV_LOADED:
+            load_dotenv()
+            _DOTENV_LOADED = True
+        
         self.GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
         
         if not self.GEMINI_API_KEY:
@@ -102,13 +206,30 @@ class Config:
         print("=" * 70 + "\n")
 
 
+@functools.lru_cache(maxsize=1)
+def get_config(config_path: str = "config.yaml") -> Config:
+    """
+    Return the process-wide Config, loading it on first call.
+    
+    The instance is shared, so treat it as read-only for the lifetime of
+    the process. Construct Config directly if a separate copy is needed.
+    
+    Args:
+        config_path: Path to config.yaml file
+    
+    Returns:
+        Shared Config instance
+    """
+    return Config(config_path)
+
+
 # ============================================================================
 # MAIN (for testing)
 # ============================================================================
 
 if __name__ == "__main__":
     try:
-        config = Config()
+        config = get_config()
         config.display()
         config.validate()
         print("     Configuration valid\n")
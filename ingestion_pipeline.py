@@ -3,21 +3,37 @@ Document Ingestion Pipeline
 Handles document loading, metadata extraction, and vector store creation
 """
 
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import sys
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import numpy as np
 from langchain_core.documents import Document
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import Chroma
 
-from config import Config
+from config import Config, get_config
 from logger import setup_logger
-from models import DocumentMetadata
+from models import HEADER_SIZE, DocType, doc_type_from_filename, extract_document
+
+# Heavy LangChain/Google/FAISS imports are deferred to the methods that need them
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.vectorstores import VectorStore
+
+# Saved inside the vector store's persist dir to detect knowledge base changes
+MANIFEST_FILENAME = "manifest.json"
 
 
 class IngestionPipeline:
     """
     Pipeline for ingesting documents into vector store.
-    Handles metadata extraction and Chroma DB creation.
+    Handles metadata extraction and Chroma DB (or FAISS index) creation.
     """
     
     def __init__(self, config: Config):
@@ -28,9 +44,15 @@ class IngestionPipeline:
             config: Configuration object
         """
         self.config = config
-        self.logger = setup_logger(name="IngestionPipeline", log_level="INFO")
+        self.logger = setup_logger(name="IngestionPipeline", log_level=config.LOG_LEVEL)
         self.kb_path = Path(config.KNOWLEDGE_BASE_PATH)
         self.vectorstore = None
+        self.persist_dir = Path(
+            config.FAISS_PERSIST_DIR if config.VECTOR_BACKEND == 'faiss'
+            else config.CHROMA_PERSIST_DIR
+        )
+        # Indexed documents per doc_type; None until a store with a manifest is loaded
+        self.doc_type_counts: Optional[Dict[str, int]] = None
         
         self._initialize_embeddings()
         
@@ -40,6 +62,7 @@ class IngestionPipeline:
         """Initialize embedding model based on active provider."""
         try:
             if self.config.ACTIVE_PROVIDER == 'gemini':
+                from langchain_google_genai import GoogleGenerativeAIEmbeddings
                 self.embedding = GoogleGenerativeAIEmbeddings(
                     model=self.config.EMBEDDING_MODEL,
                     google_api_key=self.config.GEMINI_API_KEY,
@@ -72,34 +95,30 @@ class IngestionPipeline:
             self.logger.error(f"Failed to initialize embeddings: {e}")
             raise
     
-    def ingest_documents(self) -> Chroma:
+    def ingest_documents(self) -> "VectorStore":
         """
         Main ingestion method:
         1. Load all .txt files from knowledge base
-        2. Extract metadata from each document
-        3. Create vector store and persist to disk
+        2. Compare against the manifest saved with the vector store
+        3. Extract metadata from new/changed documents
+        4. Create or update vector store and persist to disk
         
         Returns:
-            Chroma vector store instance
+            Vector store instance
         """
         print("Initializing RAG Pipeline...")
         self.logger.info("Starting document ingestion")
         
         print(f"    Ingesting documents from: {self.kb_path}")
-
-        vectorstore_path = Path(self.config.CHROMA_PERSIST_DIR)
-        if vectorstore_path.exists():
-            self.logger.info("Removing existing vector store...")
-            import shutil
-            shutil.rmtree(vectorstore_path)
-            self.logger.info("Existing vector store removed.")
         
         if not self.kb_path.exists():
             error_msg = f"Knowledge base not found: {self.kb_path}"
             self.logger.error(error_msg)
             raise FileNotFoundError(error_msg)
         
-        txt_files = list(self.kb_path.glob("*.txt"))
+        # DirEntry caches its stat, so each file is stat'ed once
+        with os.scandir(self.kb_path) as it:
+            txt_files = [e for e in it if e.is_file() and e.name.endswith('.txt')]
         
         if not txt_files:
             error_msg = f"No .txt files in {self.kb_path}"
@@ -109,49 +128,97 @@ class IngestionPipeline:
         print(f"Found {len(txt_files)} files\n")
         self.logger.info(f"Found {len(txt_files)} .txt files")
         
-        all_documents = []
+        manifest = self._build_manifest(txt_files)
+        existing = self._read_manifest()
+        vectorstore_path = self.persist_dir
         
-        for filepath in txt_files:
-            try:
-                print(f"    Processing: {filepath.name}")
-                self.logger.debug(f"Processing file: {filepath.name}")
-                
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                metadata_extractor = DocumentMetadata(filepath.name, content)
-                langchain_doc = metadata_extractor._to_langchain_document()
-                
-                meta = metadata_extractor._to_pydantic()
-                print(f"      Type: {meta.doc_type}")
-                print(f"      Date: {meta.year}")
-                print(f"      Version: {meta.version}")
-            
-                all_documents.append(langchain_doc)
-                self.logger.info(f"Successfully processed: {filepath.name}")
-                print()
-            
-            except Exception as e:
-                self.logger.error(f"Failed to process {filepath.name}: {e}")
-                print(f"    Error processing {filepath.name}: {e}\n")
-                continue
+        if existing == manifest:
+            print("    Knowledge base unchanged, reusing existing vector store\n")
+            self.logger.info("Manifest unchanged, skipping re-embedding")
+            return self.load_existing_vectorstore()
         
-        if not all_documents:
+        # FAISS HNSW indexes can't remove vectors, so replacing a file means a
+        # rebuild. An SQ8 quantizer is trained on the vectors of one build and
+        # would clip later ones outside its ranges, so it rebuilds on any change
+        if existing is not None and self.config.VECTOR_BACKEND == 'faiss' and (
+                self.config.FAISS_QUANTIZATION == 'sq8'
+                or any(existing[name] != manifest.get(name) for name in existing)):
+            self.logger.info("Changed files in FAISS index, rebuilding")
+            existing = None
+        
+        if existing is None:
+            # No usable manifest means the store is missing, predates
+            # manifests or was built with different index settings
+            if vectorstore_path.exists():
+                self.logger.info("Removing existing vector store...")
+                shutil.rmtree(vectorstore_path)
+                self.logger.info("Existing vector store removed.")
+            changed = set(manifest)
+            stale = set()
+        else:
+            changed = {name for name in manifest if existing.get(name) != manifest[name]}
+            stale = {name for name in existing if existing[name] != manifest.get(name)}
+            self.logger.info(
+                f"Incremental update: {len(changed)} new/modified, "
+                f"{len(set(existing) - set(manifest))} removed"
+            )
+        
+        all_documents = self._load_documents(
+            [entry for entry in txt_files if entry.name in changed]
+        )
+        
+        if changed and not all_documents:
             error_msg = "No documents were successfully processed"
             self.logger.error(error_msg)
             raise ValueError(error_msg)
         
-        # Create vector store
+        # Create or update vector store
         print("     Creating vector store...")
-        self.logger.info("Creating Chroma vector store...")
+        self.logger.info(f"Creating {self.config.VECTOR_BACKEND} vector store...")
         
         try:
-            self.vectorstore = Chroma.from_documents(
-                documents=all_documents,
-                embedding=self.embedding,
-                collection_name=self.config.COLLECTION_NAME,
-                persist_directory=self.config.CHROMA_PERSIST_DIR
-            )
+            if self.config.VECTOR_BACKEND == 'faiss':
+                self.vectorstore = self._new_faiss() if existing is None else self._load_faiss()
+            else:
+                from langchain_community.vectorstores import Chroma
+                self.vectorstore = Chroma(
+                    collection_name=self.config.COLLECTION_NAME,
+                    embedding_function=self.embedding,
+                    persist_directory=self.config.CHROMA_PERSIST_DIR,
+                    collection_metadata={
+                        "hnsw:space": self.config.HNSW_SPACE,
+                        "hnsw:construction_ef": self.config.HNSW_CONSTRUCTION_EF,
+                        "hnsw:M": self.config.HNSW_M,
+                    }
+                )
+            
+            # Documents are keyed by filename so changed files can be replaced
+            if stale:
+                self.vectorstore.delete(ids=sorted(stale))
+                self.logger.debug(f"Deleted {len(stale)} stale documents")
+            
+            # One embedding request per batch instead of per document
+            batch_size = self.config.EMBEDDING_BATCH_SIZE
+            if self.config.VECTOR_BACKEND == 'faiss':
+                self._add_to_faiss(all_documents, batch_size)
+                # Chroma writes through to disk; FAISS is saved explicitly
+                self.vectorstore.save_local(str(self.persist_dir))
+            else:
+                for start in range(0, len(all_documents), batch_size):
+                    batch = all_documents[start:start + batch_size]
+                    self.vectorstore.add_documents(
+                        batch, ids=[doc.metadata['source'] for doc in batch]
+                    )
+                    self.logger.debug(f"Embedded batch of {len(batch)} documents")
+            
+            # Only record files that actually made it into the store
+            indexed = {doc.metadata['source'] for doc in all_documents}
+            manifest = {
+                name: entry for name, entry in manifest.items()
+                if name in indexed or name not in changed
+            }
+            self._write_manifest(manifest)
+            self.doc_type_counts = self._count_doc_types(manifest)
             
             print(f"    Indexed {len(all_documents)} documents from {len(txt_files)} files\n")
             self.logger.info(
@@ -165,32 +232,402 @@ class IngestionPipeline:
             self.logger.error(f"Failed to create vector store: {e}")
             raise
     
-    def load_existing_vectorstore(self) -> Chroma:
+    def _load_documents(self, txt_files: List[os.DirEntry]) -> List[Document]:
+        """
+        Read and convert files to Documents on a thread pool.
+        Files that fail to process are logged and skipped.
+        
+        Args:
+            txt_files: Directory entries of the .txt files to load
+            
+        Returns:
+            Successfully processed documents, in input order
+        """
+        all_documents = []
+        
+        if not txt_files:
+            return all_documents
+        
+        max_workers = min(32, len(txt_files))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._process_file, entry) for entry in txt_files]
+            
+            for entry, future in zip(txt_files, futures):
+                try:
+                    langchain_doc, messages = future.result()
+                    
+                    # One write per file instead of one print per line
+                    if self.config.VERBOSE:
+                        sys.stdout.write("\n".join(messages) + "\n\n")
+                    
+                    all_documents.append(langchain_doc)
+                    self.logger.info(f"Successfully processed: {entry.name}")
+                
+                except Exception as e:
+                    self.logger.error(f"Failed to process {entry.name}: {e}")
+                    print(f"    Error processing {entry.name}: {e}\n")
+                    continue
+        
+        return all_documents
+    
+    @staticmethod
+    def _build_manifest(txt_files: List[os.DirEntry]) -> Dict[str, List[int]]:
+        """
+        Fingerprint knowledge base files by modification time and size.
+        
+        Args:
+            txt_files: Directory entries of the .txt files
+            
+        Returns:
+            Mapping of filename to [mtime_ns, size]
+        """
+        manifest = {}
+        for entry in txt_files:
+            stat = entry.stat()
+            manifest[entry.name] = [stat.st_mtime_ns, stat.st_size]
+        return manifest
+    
+    def _index_settings(self) -> Dict[str, object]:
+        """
+        Settings baked into the stored vectors and index. Changing any of
+        them makes the saved store unusable, so they are kept in the manifest.
+        
+        Returns:
+            Mapping of setting name to value
+        """
+        return {
+            "embedding_model": self.config.EMBEDDING_MODEL,
+            "embedding_dimension": self.config.EMBEDDING_DIMENSION,
+            "collection_name": self.config.COLLECTION_NAME,
+            "vector_backend": self.config.VECTOR_BACKEND,
+            "hnsw_space": self.config.HNSW_SPACE,
+            "hnsw_m": self.config.HNSW_M,
+            "hnsw_construction_ef": self.config.HNSW_CONSTRUCTION_EF,
+            "faiss_quantization": self.config.FAISS_QUANTIZATION,
+        }
+    
+    def _load_manifest(self) -> Optional[dict]:
+        """
+        Load the raw manifest saved alongside the vector store.
+        
+        Returns:
+            Saved manifest, or None if missing or unreadable
+        """
+        manifest_file = self.persist_dir / MANIFEST_FILENAME
+        try:
+            saved = json.loads(manifest_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        return saved if isinstance(saved, dict) else None
+    
+    def _read_manifest(self) -> Optional[Dict[str, List[int]]]:
+        """
+        Read the manifest saved alongside the vector store.
+        
+        Returns:
+            Saved file fingerprints, or None if missing, unreadable or built
+            with different index settings
+        """
+        saved = self._load_manifest()
+        
+        # Manifests from before settings were recorded are plain file mappings
+        if saved is None or 'files' not in saved:
+            return None
+        
+        if saved.get('settings') != self._index_settings():
+            self.logger.info("Index settings changed since the last ingestion, rebuilding")
+            return None
+        
+        return saved['files']
+    
+    def _write_manifest(self, manifest: Dict[str, List[int]]):
+        """
+        Save the manifest alongside the vector store.
+        
+        Args:
+            manifest: Mapping of filename to [mtime_ns, size]
+        """
+        manifest_file = self.persist_dir / MANIFEST_FILENAME
+        manifest_file.write_text(
+            json.dumps({"settings": self._index_settings(), "files": manifest}),
+            encoding='utf-8'
+        )
+    
+    def store_fingerprint(self) -> Optional[str]:
+        """
+        Fingerprint of the saved vector store: a hash of its manifest, which
+        records the index settings (embedding model included) and every
+        indexed file. Anything derived from the store's contents can be
+        keyed on it.
+        
+        Returns:
+            Hex digest, or None if the store has no manifest
+        """
+        try:
+            return hashlib.sha256((self.persist_dir / MANIFEST_FILENAME).read_bytes()).hexdigest()
+        except OSError:
+            return None
+    
+    @staticmethod
+    def _count_doc_types(manifest: Dict[str, List[int]]) -> Dict[str, int]:
+        """
+        Count indexed documents per doc_type. The type comes from the
+        filename, so the manifest is enough and no document is re-read.
+        
+        Args:
+            manifest: Mapping of filename to [mtime_ns, size]
+            
+        Returns:
+            Mapping of every doc_type to its document count
+        """
+        counts = Counter(doc_type_from_filename(name) for name in manifest)
+        return {doc_type.value: counts[doc_type.value] for doc_type in DocType}
+    
+    def _process_file(self, entry: os.DirEntry) -> Tuple[Document, List[str]]:
+        """
+        Read a single file and convert it to a LangChain Document.
+        Runs on a worker thread, so it must not touch shared state;
+        console messages are returned for the caller to print.
+        
+        Args:
+            entry: Directory entry of the .txt file
+            
+        Returns:
+            LangChain Document with extracted metadata, and its console messages
+        """
+        self.logger.debug(f"Processing file: {entry.name}")
+        
+        file_stat = entry.stat()
+        
+        # mmap cannot map empty files
+        if file_stat.st_size == 0:
+            header, content = b"", ""
+        else:
+            # Metadata is scanned on the raw bytes; only the body is decoded
+            with open(entry.path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                header = mm[:HEADER_SIZE]
+                # Match text-mode open(): universal newlines
+                content = mm[:].decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        
+        notes = []
+        langchain_doc = extract_document(
+            Path(entry.path), content, file_stat=file_stat, header=header, notes=notes
+        )
+        for note in notes:
+            self.logger.info(note)
+        
+        meta = langchain_doc.metadata
+        messages = [
+            f"    Processing: {entry.name}",
+            *(f"      {note}" for note in notes),
+            f"      Type: {meta['doc_type']}",
+            f"      Date: {meta['year']}",
+            f"      Version: {meta['version']}",
+        ]
+        return langchain_doc, messages
+    
+    def prefetch_vectorstore(self) -> int:
+        """
+        Ask the kernel to start reading the persisted vector store into the
+        page cache, so the first searches don't stall on disk reads.
+        Readahead is asynchronous; this returns as soon as it is requested.
+        
+        Returns:
+            Number of files prefetched (0 where posix_fadvise is unavailable)
+        """
+        if not hasattr(os, 'posix_fadvise'):
+            return 0
+        
+        prefetched = 0
+        pending = [str(self.persist_dir)]
+        
+        # The HNSW segment files live in per-collection subdirectories
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            
+            for entry in entries:
+                if entry.is_dir():
+                    pending.append(entry.path)
+                    continue
+                try:
+                    fd = os.open(entry.path, os.O_RDONLY)
+                    try:
+                        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                    finally:
+                        os.close(fd)
+                    prefetched += 1
+                except OSError as e:
+                    self.logger.debug(f"Prefetch skipped for {entry.name}: {e}")
+        
+        self.logger.debug(f"Prefetched {prefetched} vector store files")
+        return prefetched
+    
+    def _faiss_options(self) -> dict:
+        """
+        LangChain FAISS options matching retrieval.hnsw_space.
+        
+        Returns:
+            Keyword arguments for the FAISS vector store
+        """
+        from langchain_community.vectorstores.utils import DistanceStrategy
+        
+        space = self.config.HNSW_SPACE
+        return {
+            # Cosine is inner product over unit vectors. LangChain warns that
+            # this pairing is "not applicable" but still normalizes
+            "normalize_L2": space == 'cosine',
+            "distance_strategy": (
+                DistanceStrategy.EUCLIDEAN_DISTANCE if space == 'l2'
+                else DistanceStrategy.MAX_INNER_PRODUCT
+            ),
+        }
+    
+    def _new_faiss(self) -> "FAISS":
+        """
+        Create an empty FAISS HNSW vector store.
+        
+        Returns:
+            FAISS vector store instance
+        """
+        import faiss
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+        
+        metric = faiss.METRIC_L2 if self.config.HNSW_SPACE == 'l2' else faiss.METRIC_INNER_PRODUCT
+        if self.config.FAISS_QUANTIZATION == 'sq8':
+            # int8 codes: a quarter of the float32 bytes per distance evaluation
+            index = faiss.IndexHNSWSQ(
+                self.config.EMBEDDING_DIMENSION, faiss.ScalarQuantizer.QT_8bit,
+                self.config.HNSW_M, metric
+            )
+        else:
+            index = faiss.IndexHNSWFlat(self.config.EMBEDDING_DIMENSION, self.config.HNSW_M, metric)
+        index.hnsw.efConstruction = self.config.HNSW_CONSTRUCTION_EF
+        index.hnsw.efSearch = self.config.HNSW_SEARCH_EF
+        
+        self.logger.debug(f"FAISS compile options: {faiss.get_compile_options()}")
+        
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="Normalizing L2 is not applicable")
+            return FAISS(
+                embedding_function=self.embedding,
+                index=index,
+                docstore=InMemoryDocstore(),
+                index_to_docstore_id={},
+                **self._faiss_options()
+            )
+    
+    def _add_to_faiss(self, documents: List[Document], batch_size: int):
+        """
+        Embed documents and add them to the FAISS store. A scalar-quantized
+        index must learn its per-dimension ranges first, so an untrained
+        index is trained on all of the new vectors before anything is added.
+        Quantized indexes are always rebuilt, so training sees every document.
+        
+        Args:
+            documents: Documents to index
+            batch_size: Documents per embedding request
+        """
+        if not documents:
+            return
+        
+        import faiss
+        
+        texts = [doc.page_content for doc in documents]
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            vectors.extend(self.embedding.embed_documents(texts[start:start + batch_size]))
+            self.logger.debug(f"Embedded batch of {len(texts[start:start + batch_size])} documents")
+        
+        index = self.vectorstore.index
+        if not index.is_trained:
+            training = np.asarray(vectors, dtype=np.float32)
+            # Train on the same vectors the store will add
+            if self.vectorstore._normalize_L2:
+                faiss.normalize_L2(training)
+            index.train(training)
+            self.logger.debug(f"Trained FAISS quantizer on {len(training)} vectors")
+        
+        self.vectorstore.add_embeddings(
+            list(zip(texts, vectors)),
+            metadatas=[doc.metadata for doc in documents],
+            ids=[doc.metadata['source'] for doc in documents]
+        )
+    
+    def _load_faiss(self) -> "FAISS":
+        """
+        Load the FAISS vector store saved by ingest_documents().
+        
+        Returns:
+            FAISS vector store instance
+        """
+        from langchain_community.vectorstores import FAISS
+        
+        # The docstore is a pickle this pipeline wrote itself
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="Normalizing L2 is not applicable")
+            vectorstore = FAISS.load_local(
+                str(self.persist_dir),
+                self.embedding,
+                allow_dangerous_deserialization=True,
+                **self._faiss_options()
+            )
+        # efSearch is a search-time setting and is not saved with the index
+        vectorstore.index.hnsw.efSearch = self.config.HNSW_SEARCH_EF
+        return vectorstore
+    
+    def load_existing_vectorstore(self) -> "VectorStore":
         """
         Load existing vector store from disk.
         
         Returns:
-            Chroma vector store instance
+            Vector store instance
         """
-        persist_dir = Path(self.config.CHROMA_PERSIST_DIR)
+        persist_dir = self.persist_dir
         
         if not persist_dir.exists():
             error_msg = (
-                f"Chroma DB not found at {self.config.CHROMA_PERSIST_DIR}. "
+                f"Vector store not found at {persist_dir}. "
                 "Please run ingest_documents() first."
             )
             self.logger.error(error_msg)
             raise FileNotFoundError(error_msg)
         
-        try:
-            self.vectorstore = Chroma(
-                persist_directory=self.config.CHROMA_PERSIST_DIR,
-                embedding_function=self.embedding,
-                collection_name=self.config.COLLECTION_NAME
+        # A store built with other index settings can't serve these queries;
+        # reported like a missing store so callers fall back to ingesting,
+        # which rebuilds it
+        saved = self._load_manifest()
+        if saved is not None and 'settings' in saved \
+                and saved['settings'] != self._index_settings():
+            error_msg = (
+                f"Vector store at {persist_dir} was built with different index settings. "
+                "Please run ingest_documents() to rebuild it."
             )
+            self.logger.error(error_msg)
+            raise FileNotFoundError(error_msg)
+        
+        try:
+            if self.config.VECTOR_BACKEND == 'faiss':
+                self.vectorstore = self._load_faiss()
+            else:
+                from langchain_community.vectorstores import Chroma
+                self.vectorstore = Chroma(
+                    persist_directory=self.config.CHROMA_PERSIST_DIR,
+                    embedding_function=self.embedding,
+                    collection_name=self.config.COLLECTION_NAME
+                )
+            
+            manifest = self._read_manifest()
+            if manifest is not None:
+                self.doc_type_counts = self._count_doc_types(manifest)
             
-            print(f"    Loaded existing vector store from {self.config.CHROMA_PERSIST_DIR}")
-            self.logger.info(f"Loaded vector store from {self.config.CHROMA_PERSIST_DIR}")
+            print(f"    Loaded existing vector store from {persist_dir}")
+            self.logger.info(f"Loaded vector store from {persist_dir}")
             
             return self.vectorstore
         
@@ -205,7 +642,7 @@ class IngestionPipeline:
 
 if __name__ == "__main__":
     try:
-        config = Config()
+        config = get_config()
         
         pipeline = IngestionPipeline(config)
         
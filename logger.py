@@ -2,43 +2,41 @@
 Logs to both console and file in output_logs/ folder
 """
 
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from datetime import datetime
 
 
-def setup_logger(
-    name: str = "RAG_System",
-    log_level: str = "INFO",
-    log_dir: str = "output_logs"
-) -> logging.Logger:
+# Shared by every logger: records are queued by the caller and written to
+# console/file on a background thread by a single listener.
+_log_queue = None
+_listener = None
+_log_file = None
+
+
+def _start_listener(log_dir: str) -> queue.Queue:
     """
-    Setup logger with console and file handlers.
+    Start the process-wide queue listener on first use.
     
     Args:
-        name: Logger name
-        log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_dir: Directory to store log files
     
     Returns:
-        Configured logger instance
+        Queue that loggers should push records onto
     """
+    global _log_queue, _listener, _log_file
     
-    # Create logger
-    logger = logging.getLogger(name)
-    logger.setLevel(getattr(logging, log_level.upper()))
-    
-    # Prevent duplicate handlers if logger already exists
-    if logger.handlers:
-        return logger
+    if _listener is not None:
+        return _log_queue
     
     # Create log directory if it doesn't exist
     log_path = Path(log_dir)
     log_path.mkdir(exist_ok=True)
     
-    # Create log filename with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = log_path / f"rag_system_{timestamp}.log"
+    # Single rotating log file shared by every invocation
+    _log_file = log_path / "rag_system.log"
     
     # Format for logs (includes file and line number)
     formatter = logging.Formatter(
@@ -51,16 +49,61 @@ def setup_logger(
     console_handler.setLevel(logging.WARNING)
     console_handler.setFormatter(formatter)
     
-    # File handler (writes to file)
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+    # File handler (writes to file, opened lazily on the first record)
+    file_handler = RotatingFileHandler(
+        _log_file,
+        maxBytes=10 * 1024 * 1024,
+        backupCount=5,
+        encoding='utf-8',
+        delay=True
+    )
     file_handler.setLevel(logging.DEBUG)  # Log everything to file
     file_handler.setFormatter(formatter)
     
-    # Add handlers to logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    _log_queue = queue.Queue(-1)
+    _listener = QueueListener(
+        _log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
+    
+    # Drain the queue before the interpreter exits
+    atexit.register(_listener.stop)
+    
+    return _log_queue
+
+
+def setup_logger(
+    name: str = "RAG_System",
+    log_level: str = "WARNING",
+    log_dir: str = "output_logs"
+) -> logging.Logger:
+    """
+    Setup logger with console and file handlers.
+    
+    All loggers share one background listener, so the log directory of the
+    first call is used for the whole process.
+    
+    Args:
+        name: Logger name
+        log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        log_dir: Directory to store log files
+    
+    Returns:
+        Configured logger instance
+    """
+    
+    # Create logger
+    logger = logging.getLogger(name)
+    logger.setLevel(getattr(logging, log_level.upper()))
+    
+    # Prevent duplicate handlers if logger already exists
+    if logger.handlers:
+        return logger
+    
+    # Hand records off to the listener thread instead of writing inline
+    logger.addHandler(QueueHandler(_start_listener(log_dir)))
     
-    logger.info(f"Logger initialized. Logs saved to: {log_file}")
+    logger.info(f"Logger initialized. Logs saved to: {_log_file}")
     
     return logger
 
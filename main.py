@@ -5,7 +5,7 @@ Supports both command-line arguments and interactive mode.
 
 import argparse
 import sys
-from config import Config
+from config import get_config
 from rag_engine import RagEngine
 from logger import setup_logger
 
@@ -65,7 +65,7 @@ Examples:
     
     try:
         # Initialize configuration and RAG engine
-        config = Config()
+        config = get_config()
         rag = RagEngine(config)
         
         # Load or ingest documents
@@ -81,7 +81,7 @@ Examples:
                 rag.load_vectorstore()
                 logger.info("Vector store loaded successfully")
             except FileNotFoundError:
-                logger.warning("Vector store not found. Ingesting documents...")
+                logger.warning("Vector store not found or out of date. Ingesting documents...")
                 rag.ingest_documents()
         
         # Determine question source
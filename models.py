@@ -7,12 +7,41 @@ import os
 import re
 from pathlib import Path
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Set, Tuple
 from enum import Enum
 from pydantic import BaseModel, Field, field_validator
 from langchain_core.documents import Document
 
 
+# ============================================================================
+# PATTERNS
+# ============================================================================
+
+# Single pass over the filename: version, year and doc-type keywords.
+# The version's trailing underscore is a lookahead so "_v2_2024.txt" still
+# leaves "_2024.txt" for the year branch.
+_FN_RE = re.compile(
+    r'(?:_v(?P<ver>\d+)(?=_))'
+    r'|(?:_(?P<year>\d{4})\.txt)'
+    r'|(?P<policy>policy)'
+    r'|(?P<menu>menu|cafeteria)'
+    r'|(?P<memo>memo)',
+    re.IGNORECASE
+)
+# Bytes patterns so the raw file head can be scanned without decoding it
+_EFF_TEXT_RE = re.compile(rb'Effective Date:\s*([A-Za-z]+\s+\d{1,2},\s*\d{4})')
+_EFF_ISO_RE = re.compile(rb'Effective Date:\s*(\d{4}-\d{2}-\d{2})')
+
+# (pattern, parser) pairs tried in order; fromisoformat is C-accelerated
+_DATE_PARSERS = [
+    (_EFF_TEXT_RE, lambda date_str: datetime.strptime(date_str, "%b %d, %Y")),
+    (_EFF_ISO_RE, datetime.fromisoformat),
+]
+
+# Metadata such as "Effective Date:" lives in the document head
+HEADER_SIZE = 4096
+
+
 # ============================================================================
 # ENUMS
 # ============================================================================
@@ -73,106 +102,215 @@ class QueryIntent(BaseModel):
 # METADATA EXTRACTION
 # ============================================================================
 
+def _scan_filename(filename: str) -> Tuple[Set[str], Optional[int], Optional[int]]:
+    """
+    Walk the filename once, recording which doc-type keywords are present
+    and the first year and version found.
+    
+    Args:
+        filename: Name of the document file
+    
+    Returns:
+        Tuple of (keywords, year or None, version or None)
+    """
+    keywords = set()
+    year = None
+    version = None
+
+    for match in _FN_RE.finditer(filename):
+        kind = match.lastgroup
+        if kind == 'ver':
+            if version is None:
+                version = int(match.group('ver'))
+        elif kind == 'year':
+            if year is None:
+                year = int(match.group('year'))
+        else:
+            keywords.add(kind)
+
+    return keywords, year, version
+
+
+def _classify_doc_type(keywords: Set[str]) -> str:
+    """
+    Classify document based on filename keywords.
+    
+    Args:
+        keywords: Doc-type keywords found in the filename
+    
+    Returns:
+        Document type as string
+    """
+    if 'policy' in keywords:
+        return DocType.POLICY.value
+    elif 'menu' in keywords:
+        return DocType.MENU.value
+    elif 'memo' in keywords:
+        return DocType.MEMO.value
+    else:
+        return DocType.GENERAL.value
+
+
+def doc_type_from_filename(filename: str) -> str:
+    """
+    Document type of a knowledge base file, from its name alone.
+    
+    Args:
+        filename: Name of the document file
+    
+    Returns:
+        Document type as string
+    """
+    keywords, _, _ = _scan_filename(filename)
+    return _classify_doc_type(keywords)
+
+
+def _extract_date(
+    filepath: Path,
+    header: bytes,
+    year: Optional[int],
+    file_stat: Optional[os.stat_result] = None,
+    notes: Optional[List[str]] = None
+) -> datetime:
+    """
+    Extract date from filename or content.
+    Falls back to file modification date if not found.
+    
+    Args:
+        filepath: Path to the document file
+        header: Leading bytes of the document
+        year: Year parsed from the filename, if any
+        file_stat: Already-known stat of the file, avoids another stat call
+        notes: Collects warnings for the caller to report; printed if None
+    
+    Returns:
+        datetime object
+    """
+    # Search from filename - easier
+    if year is not None:
+        return datetime(year, 1, 1)
+    
+    # Search from document head - more complex
+    for pattern, parse in _DATE_PARSERS:
+        match = pattern.search(header)
+        if match:
+            try:
+                return parse(match.group(1).decode('ascii'))
+            except ValueError:
+                continue
+    
+    # Fallback to file modification date
+    file_stat = file_stat or filepath.stat()
+    doc_date = datetime.fromtimestamp(file_stat.st_mtime)
+    warning = f"Warning: No date in {filepath.name}, using file date: {doc_date.strftime('%Y-%m-%d')}"
+    if notes is None:
+        print(warning)
+    else:
+        notes.append(warning)
+    return doc_date
+
+
+def _extract_fields(
+    filepath: Path,
+    content: str,
+    file_stat: Optional[os.stat_result] = None,
+    header: Optional[bytes] = None,
+    notes: Optional[List[str]] = None
+) -> Tuple[str, datetime, int]:
+    """
+    Extract document type, effective date and version (0 if none).
+    
+    Returns:
+        Tuple of (doc_type, effective_date, version)
+    """
+    if header is None:
+        header = content[:HEADER_SIZE].encode('utf-8')
+
+    keywords, year, version = _scan_filename(filepath.name)
+    doc_type = _classify_doc_type(keywords)
+    effective_date = _extract_date(filepath, header, year, file_stat, notes)
+    return doc_type, effective_date, version or 0
+
+
+def extract_document(
+    filepath: Path,
+    content: str,
+    file_stat: Optional[os.stat_result] = None,
+    header: Optional[bytes] = None,
+    notes: Optional[List[str]] = None
+) -> Document:
+    """
+    Build a LangChain Document with extracted metadata for the vector store.
+    
+    Args:
+        filepath: Path to the document file
+        content: Full text content of the document
+        file_stat: Already-known stat of the file, avoids another stat call
+        header: Raw leading bytes of the file; derived from content if omitted
+        notes: Collects extraction warnings for the caller to report; printed if None
+    
+    Returns:
+        LangChain Document instance
+    """
+    filepath = Path(filepath)
+    doc_type, effective_date, version = _extract_fields(
+        filepath, content, file_stat, header, notes
+    )
+
+    # Values are already typed, so the dict is built without validation
+    return Document(
+        page_content=content,
+        metadata={
+            "source": filepath.name,
+            "doc_type": doc_type,
+            "effective_date": effective_date.isoformat(),
+            "version": version,
+            "year": effective_date.year,
+        }
+    )
+
+
 class DocumentMetadata:
     """
     Metadata Extraction from files
-    Extracts document type, date, and version information
+    Object wrapper around extract_document(), kept for existing callers
     """
 
-    def __init__(self, filename: str, content: str):
+    def __init__(self, filepath: Path, content: str, file_stat: Optional[os.stat_result] = None):
         """
         Initialize metadata extractor.
         
         Args:
-            filename: Name of the document file
+            filepath: Path to the document file
             content: Full text content of the document
+            file_stat: Already-known stat of the file, avoids another stat call
         """
-        self.filename = filename
+        self.filepath = Path(filepath)
+        self.filename = self.filepath.name
         self.content = content
 
-        self.docType = self._classify_doc_type()
-        self.effective_date = self._extract_date()
-        self.version = self._extract_version_info()
+        self.docType, self.effective_date, self.version = _extract_fields(
+            self.filepath, content, file_stat
+        )
 
-    def _classify_doc_type(self) -> str:
-        """
-        Classify document based on filename and content keywords.
-        
-        Returns:
-            Document type as string
-        """
-        filename = self.filename.lower()
-        content = self.content.lower()
-
-        if 'policy' in filename:
-            return DocType.POLICY.value
-        elif 'menu' in filename or 'cafeteria' in filename:
-            return DocType.MENU.value
-        elif 'memo' in filename:
-            return DocType.MEMO.value
-        else:
-            return DocType.GENERAL.value
-    
-    def _extract_date(self) -> datetime:
-        """
-        Extract date from filename or content.
-        Falls back to file modification date if not found.
-        
-        Returns:
-            datetime object
-        """
-        # Search from filename - easier
-        year_match = re.search(r'_(\d{4})\.txt', self.filename)
-        if year_match:
-            year = int(year_match.group(1))
-            return datetime(year, 1, 1)
-        
-        # Search from content - more complex
-        date_patterns = [
-            (r'Effective Date:\s*([A-Za-z]+\s+\d{1,2},\s*\d{4})', "%b %d, %Y"),
-            (r'Effective Date:\s*(\d{4}-\d{2}-\d{2})', '%Y-%m-%d'),
-        ]
-
-        for pattern, date_format in date_patterns:
-            match = re.search(pattern, self.content)
-            if match:
-                try:
-                    date_str = match.group(1)
-                    return datetime.strptime(date_str, date_format)
-                except ValueError:
-                    continue
-        
-        # Fallback to file modification date
-        file_path = Path("knowledge_base", self.filename).resolve()
-        doc_date = datetime.fromtimestamp(os.path.getmtime(file_path))
-        print(f"Warning: No date in {self.filename}, using file date: {doc_date.strftime('%Y-%m-%d')}")
-        return doc_date
-    
-    def _extract_version_info(self) -> int:
-        """
-        Extract version number (v1, v2, v3, etc.)
-        
-        Returns:
-            Version number as integer, 0 if not found
-        """
-        version_match = re.search(r'_v(\d+)_', self.filename)
-        if version_match:
-            return int(version_match.group(1))
-        return 0
+        self._meta_dict = {
+            "source": self.filename,
+            "doc_type": self.docType,
+            "effective_date": self.effective_date.isoformat(),
+            "version": self.version,
+            "year": self.effective_date.year,
+        }
     
     def _to_pydantic(self) -> PolicyMetaData:
         """
-        Convert to Pydantic model for validation.
+        Convert to Pydantic model.
+        Skips validation since fields are typed at extraction time.
         
         Returns:
             PolicyMetaData instance
         """
-        return PolicyMetaData(
-            source=self.filename,
-            doc_type=self.docType,
-            effective_date=self.effective_date.isoformat(),
-            version=self.version,
-            year=self.effective_date.year
+        return PolicyMetaData.model_construct(
+            **{**self._meta_dict, "doc_type": DocType(self.docType)}
         )
     
     def _to_langchain_document(self) -> Document:
@@ -184,7 +322,7 @@ class DocumentMetadata:
         """
         return Document(
             page_content=self.content,
-            metadata=self._to_pydantic().model_dump()
+            metadata=self._meta_dict
         )
 
 
@@ -194,7 +332,7 @@ class DocumentMetadata:
 
 if __name__ == "__main__":
     # Test metadata extraction
-    test_filename = "remote_work_policy_v2_2024.txt"
+    test_filepath = Path("knowledge_base", "remote_work_policy_v2_2024.txt")
     test_content = """
     TechCorp Remote Work Policy
     Effective Date: Jan 15, 2024
@@ -202,7 +340,7 @@ if __name__ == "__main__":
     This policy allows employees to work remotely up to 3 days per week.
     """
     
-    extractor = DocumentMetadata(test_filename, test_content)
+    extractor = DocumentMetadata(test_filepath, test_content)
     
     print("Testing DocumentMetadata:")
     print(f"  Filename: {extractor.filename}")
@@ -3,16 +3,127 @@ RAG Engine with Conflict Resolution and Noise Filtering
 Main query engine with intelligent document retrieval and filtering
 """
 
+import atexit
+import importlib.util
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple, Union
+import httpx
+import numpy as np
 from google import genai
 from langchain_core.documents import Document
-from langchain_community.vectorstores import Chroma
 
-from config import Config
+from config import Config, get_config
 from logger import setup_logger
-from models import QueryIntent, PolicyAnswer
+from models import DocType, QueryIntent, PolicyAnswer
 from ingestion_pipeline import IngestionPipeline
+from semantic_cache import SemanticCache
+
+
+# Keyword router for query intent; Gemini is only asked when this is inconclusive
+_INTENT_PATTERNS = {
+    'menu': re.compile(
+        r'\b(menus?|cafeterias?|lunch(?:es)?|dinners?|breakfasts?|meals?|food|dining)\b', re.I
+    ),
+    'memo': re.compile(r'\b(memos?|announcements?|notices?|updates?|communications?)\b', re.I),
+    'policy': re.compile(
+        r'\b(polic(?:y|ies)|rules?|allowed|remote|wfh|vacations?|leaves?|benefits?|hr|pto)\b', re.I
+    ),
+}
+# Most of these words also turn up in unrelated questions, so one hit is too
+# weak to skip Gemini: the winner needs this many hits more than the runner-up
+_MIN_KEYWORD_MARGIN = 2
+# Canonical queries used to page in the vector index before real traffic
+_WARMUP_QUERIES = ['remote work policy', 'today lunch menu', 'latest memo']
+
+# Intents that map directly onto a doc_type metadata value
+_FILTERABLE_DOC_TYPES = ('policy', 'menu', 'memo')
+
+# Response schemas are fixed, so generate them once instead of per call
+_POLICY_ANSWER_SCHEMA = PolicyAnswer.model_json_schema()
+# Intent is decoded as a bare label, not a QueryIntent object
+_INTENT_LABELS = [doc_type.value for doc_type in DocType]
+_INTENT_LABEL_LIST_SCHEMA = {"type": "array", "items": {"type": "string", "enum": _INTENT_LABELS}}
+# Output tokens for one intent label
+_INTENT_LABEL_TOKENS = 8
+
+_INTENT_PROMPT_HEADER = """Classify this employee query into ONE category based on what type of document would answer it:
+
+- "policy" - Questions about rules, permissions, procedures, what's allowed/not allowed, work requirements, benefits, HR matters, remote work, time off, company guidelines
+- "menu" - Questions about food, cafeteria, meals, dining, lunch, dinner, breakfast
+- "memo" - Questions about announcements, updates, communications, notices
+- "general" - Unclear or could need multiple document types"""
+
+# Per-call prompts: the static header stays an identical prefix and only the
+# tail is filled in with format_map
+_INTENT_PROMPT = _INTENT_PROMPT_HEADER + """
+
+Query: {query}
+
+Respond with ONLY the category name (policy, menu, memo, or general). Nothing else."""
+
+_INTENT_BATCH_PROMPT = _INTENT_PROMPT_HEADER + """
+
+Queries:
+{queries}
+
+Respond with a JSON array holding ONLY the category name of each query, in the same order."""
+
+_CTX_TEMPLATE = (
+    "=== Document: {source} ===\n"
+    "Type: {doc_type}\n"
+    "Year: {year}\n"
+    "Version: v{version}\n"
+    "Effective Date: {effective_date}\n\n"
+    "Content:\n{content}\n"
+)
+
+
+class _ContextFields(dict):
+    """Template fields for one document, with fallbacks for metadata missing from older stores."""
+    
+    _DEFAULTS = {'source': 'unknown', 'doc_type': 'unknown'}
+    
+    def __missing__(self, key: str) -> str:
+        return self._DEFAULTS.get(key, 'N/A')
+
+
+# Canned reply when the documents can't answer; also quoted in the instructions
+_NO_INFORMATION_ANSWER = (
+    "I don't have information about that in the company documents. "
+    "I can only help with TechCorp policies, menus, and memos."
+)
+
+# Gemini rejects explicit caches smaller than this many tokens
+_MIN_PROMPT_CACHE_TOKENS = 1024
+
+# Static answer instructions. Kept separate from the per-query documents and
+# question so Gemini can cache them as a prefix.
+_ANSWER_SYSTEM_PROMPT = f"""You are a helpful HR assistant for TechCorp Inc.
+
+Answer the employee's question using ONLY the provided documents.
+
+1. ONLY answer if the documents contain relevant information to the question.
+2. ALWAYS prioritize the MOST RECENT policy when there are conflicts
+3. If an older policy contradicts a newer policy, the NEWER policy wins
+4. If the documents DO NOT contain information to answer the question, respond with:
+   "answer": "{_NO_INFORMATION_ANSWER}", "cited_sources": []
+5. DO NOT make up information or use knowledge outside the provided documents
+6. Be direct and concise"""
+
+# Per-query answer request; documents first, the question strictly last
+_ANSWER_PROMPT = """Documents:
+{context}
+
+EMPLOYEE QUESTION: {question}
+
+ANSWER (with citations):"""
 
 
 class RagEngine:
@@ -31,16 +142,103 @@ class RagEngine:
             config: Configuration object
         """
         self.config = config
-        self.logger = setup_logger(name="RagEngine", log_level="INFO")
+        self.logger = setup_logger(name="RagEngine", log_level=self.config.LOG_LEVEL)
         
-        self.client = genai.Client(api_key=self.config.GEMINI_API_KEY)
+        self.client = genai.Client(
+            api_key=self.config.GEMINI_API_KEY,
+            http_options=self._http_options()
+        )
         self.logger.info(f"Initialized Gemini client with model: {self.config.GEMINI_MODEL}")
         
         self.pipeline = IngestionPipeline(config)
         self.vectorstore = None
         
+        # Runs retrieval steps that can overlap (vector search, LLM calls)
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag")
+        
+        # Opened once a vector store is loaded, see _bind_cache()
+        self.cache = None
+        
+        # Server-side cache of the static answer instructions, created lazily
+        self._prompt_cache_name = None
+        self._prompt_cache_expires = 0.0
+        self._prompt_cache_lock = threading.Lock()
+        
+        # Intent per normalized query; an LRU persisted across sessions
+        self._intent_cache: "OrderedDict[str, QueryIntent]" = OrderedDict()
+        self._intent_lock = threading.Lock()
+        self._load_intent_cache()
+        atexit.register(self._save_intent_cache)
+        
         self.logger.info("RAG Engine initialized successfully")
     
+    def _http_options(self) -> dict:
+        """
+        HTTP options for the Gemini client. The SDK keeps one httpx client
+        per genai.Client, so a sized keepalive pool lets concurrent and
+        back-to-back requests reuse warm connections.
+        
+        Returns:
+            http_options for genai.Client
+        """
+        # httpx only speaks HTTP/2 with the optional h2 package installed
+        http2 = self.config.HTTP2_ENABLED and importlib.util.find_spec('h2') is not None
+        
+        return {
+            "timeout": int(self.config.HTTP_TIMEOUT_SECONDS * 1000),  # milliseconds
+            "client_args": {
+                "http2": http2,
+                "limits": httpx.Limits(
+                    max_connections=self.config.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=self.config.HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=self.config.HTTP_KEEPALIVE_EXPIRY
+                ),
+            },
+        }
+    
+    def _load_intent_cache(self):
+        """Load intent classifications saved by a previous session."""
+        cache_path = Path(self.config.INTENT_CACHE_PATH).expanduser()
+        try:
+            data = json.loads(cache_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        
+        # Classifications from a different model are not reused
+        if data.get("model") != self.config.GEMINI_MODEL:
+            return
+        
+        try:
+            for key, intent in data.get("entries", [])[-self.config.INTENT_CACHE_SIZE:]:
+                self._intent_cache[key] = QueryIntent.model_validate(intent)
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable intent cache {cache_path}: {e}")
+            self._intent_cache.clear()
+            return
+        
+        self.logger.info(f"Loaded {len(self._intent_cache)} cached intents from {cache_path}")
+    
+    def _save_intent_cache(self):
+        """Persist intent classifications for the next session."""
+        if not self._intent_cache:
+            return
+        
+        cache_path = Path(self.config.INTENT_CACHE_PATH).expanduser()
+        with self._intent_lock:
+            entries = [
+                [key, intent.model_dump(mode="json")]
+                for key, intent in self._intent_cache.items()
+            ]
+        
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text(
+                json.dumps({"model": self.config.GEMINI_MODEL, "entries": entries}),
+                encoding='utf-8'
+            )
+        except OSError as e:
+            self.logger.warning(f"Failed to save intent cache to {cache_path}: {e}")
+    
     def load_vectorstore(self):
         """Load existing vector store from disk."""
         try:
@@ -49,6 +247,11 @@ class RagEngine:
         except Exception as e:
             self.logger.error(f"Failed to load vector store: {e}")
             raise
+        
+        self._bind_cache()
+        
+        if self.config.WARMUP_ON_INIT:
+            self._executor.submit(self.warmup)
     
     def ingest_documents(self):
         """Ingest documents and create vector store."""
@@ -58,14 +261,84 @@ class RagEngine:
         except Exception as e:
             self.logger.error(f"Failed to ingest documents: {e}")
             raise
+        
+        self._bind_cache()
+        
+        # No warmup here: ingest-only runs (main.py --ingest) exit right away,
+        # and ingestion has just paged in the index and embedding connection
+    
+    def _bind_cache(self):
+        """
+        Open the semantic cache for the loaded vector store. Cached answers
+        from a different store (re-ingested documents, another embedding
+        model) are dropped. A relative cache path lives inside the vector
+        store directory, so the cache follows the store it was built from.
+        """
+        if not self.config.CACHE_ENABLED:
+            return
+        
+        if self.cache is None:
+            path = self.config.CACHE_PATH
+            if path is not None and not Path(path).expanduser().is_absolute():
+                path = self.pipeline.persist_dir / path
+            self.cache = SemanticCache(
+                max_size=self.config.CACHE_MAX_SIZE,
+                threshold=self.config.CACHE_SIM_THRESHOLD,
+                ttl_seconds=self.config.CACHE_TTL_SECONDS,
+                path=path
+            )
+            atexit.register(self.cache.close)
+        
+        self.cache.bind(self.pipeline.store_fingerprint())
+    
+    def warmup(self):
+        """
+        Pay one-time costs before the first real query: page in the vector
+        index files and graph, open the Gemini connection and create the prompt cache.
+        Runs in the background after load_vectorstore() when
+        retrieval.warmup_on_init is set; call it directly after ingestion
+        if queries will follow.
+        """
+        self.logger.info("Warming up retrieval and Gemini connection")
+        
+        # Start disk readahead first so the warmup searches hit the page cache
+        self.pipeline.prefetch_vectorstore()
+        
+        searches = [
+            self._executor.submit(self._retrieve_documents, q, k=self.config.RETRIEVAL_TOP_K)
+            for q in _WARMUP_QUERIES
+        ]
+        
+        try:
+            self._get_prompt_cache()
+            self._classify_with_llm("warmup")
+        except Exception as e:
+            self.logger.warning(f"Gemini warmup failed: {e}")
+        
+        for future in searches:
+            try:
+                future.result()
+            except Exception as e:
+                self.logger.warning(f"Retrieval warmup failed: {e}")
+        
+        self.logger.info("Warmup complete")
     
-    def _retrieve_documents(self, query: str, k: int = 10) -> List[Document]:
+    def _retrieve_documents(
+        self,
+        query: str,
+        k: int = 10,
+        doc_type: Optional[str] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Document]:
         """
         Retrieve relevant documents using vector similarity.
         
         Args:
             query: User query
             k: Number of documents to retrieve
+            doc_type: Restrict the search to this document type (policy, menu,
+                memo); any other value searches all documents
+            query_embedding: Already-computed embedding of the query
             
         Returns:
             List of retrieved documents
@@ -76,8 +349,12 @@ class RagEngine:
             raise ValueError(error_msg)
         
         try:
-            results = self.vectorstore.similarity_search(query, k=k)
-            print(f"    Retrieved {len(results)} documents")
+            search_filter = {'doc_type': doc_type} if doc_type in _FILTERABLE_DOC_TYPES else None
+            if query_embedding is None:
+                query_embedding = self.pipeline.embedding.embed_query(query)
+            results = self.vectorstore.similarity_search_by_vector(
+                query_embedding, k=k, filter=search_filter
+            )
             self.logger.debug(f"Retrieved {len(results)} documents for query: {query}")
             return results
         except Exception as e:
@@ -85,6 +362,154 @@ class RagEngine:
             raise
     
     def _classify_query_intent(self, query: str) -> QueryIntent:
+        """
+        Classify query intent, reusing earlier classifications of the same
+        normalized query instead of calling Gemini again.
+        
+        Args:
+            query: User query
+            
+        Returns:
+            QueryIntent object with intent classification
+        """
+        fast = self._classify_without_llm(query)
+        if fast is not None:
+            return fast
+        
+        try:
+            result = self._classify_with_llm(query)
+        except Exception as e:
+            self.logger.warning(f"Intent classification failed: {e}, defaulting to 'general'")
+            return QueryIntent(intent=DocType.GENERAL, reasoning="Failed to classify", confidence=1)
+        
+        self._remember_intent(query, result)
+        return result
+    
+    def _classify_query_intents(self, queries: List[str]) -> List[QueryIntent]:
+        """
+        Classify several queries, sending every query that needs Gemini in
+        a single request.
+        
+        Args:
+            queries: User queries
+            
+        Returns:
+            QueryIntent per query, in input order
+        """
+        results: List[Optional[QueryIntent]] = [self._classify_without_llm(q) for q in queries]
+        
+        # Unresolved queries, deduplicated by their intent cache key
+        pending = {}
+        for query, result in zip(queries, results):
+            if result is None:
+                pending.setdefault(query.strip().lower(), query)
+        
+        classified = {}
+        if pending:
+            try:
+                intents = self._classify_batch_with_llm(list(pending.values()))
+                if len(intents) != len(pending):
+                    raise ValueError(f"expected {len(pending)} classifications, got {len(intents)}")
+            except Exception as e:
+                self.logger.warning(f"Batch intent classification failed: {e}, defaulting to 'general'")
+                intents = []
+            
+            for (key, query), result in zip(pending.items(), intents):
+                self._remember_intent(query, result)
+                classified[key] = result
+        
+        fallback = QueryIntent(intent=DocType.GENERAL, reasoning="Failed to classify", confidence=1)
+        
+        return [
+            result or classified.get(query.strip().lower(), fallback)
+            for query, result in zip(queries, results)
+        ]
+    
+    def _remember_intent(self, query: str, result: QueryIntent):
+        """
+        Store a Gemini classification in the intent LRU.
+        
+        Args:
+            query: User query
+            result: Its classification
+        """
+        with self._intent_lock:
+            self._intent_cache[query.strip().lower()] = result
+            if len(self._intent_cache) > self.config.INTENT_CACHE_SIZE:
+                self._intent_cache.popitem(last=False)
+    
+    def _classify_without_llm(self, query: str) -> Optional[QueryIntent]:
+        """
+        Classify query intent from keywords or an earlier classification.
+        
+        Args:
+            query: User query
+            
+        Returns:
+            QueryIntent, or None if Gemini needs to be asked
+        """
+        local = self._classify_with_keywords(query)
+        if local is not None:
+            self.logger.debug(f"Query intent from keywords: {local.intent} (confidence: {local.confidence})")
+            return local
+        
+        key = query.strip().lower()
+        
+        with self._intent_lock:
+            cached = self._intent_cache.get(key)
+            if cached is not None:
+                self._intent_cache.move_to_end(key)
+        
+        if cached is not None:
+            self.logger.debug(f"Query intent cache hit: {cached.intent}")
+        
+        return cached
+    
+    @staticmethod
+    def _keyword_hits(query: str) -> dict:
+        """
+        Count intent keyword hits per category.
+        
+        Args:
+            query: User query
+            
+        Returns:
+            Mapping of intent to number of keyword hits
+        """
+        return {
+            intent: len(pattern.findall(query))
+            for intent, pattern in _INTENT_PATTERNS.items()
+        }
+    
+    def _classify_with_keywords(self, query: str) -> Optional[QueryIntent]:
+        """
+        Classify query intent by counting keyword hits per category.
+        
+        Args:
+            query: User query
+            
+        Returns:
+            QueryIntent for a clear winner, None if the keywords are
+            inconclusive (too few hits, or too close to another category)
+        """
+        scores = self._keyword_hits(query)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (best, best_hits), (_, runner_up_hits) = ranked[0], ranked[1]
+        
+        if best_hits - runner_up_hits < _MIN_KEYWORD_MARGIN:
+            return None
+        
+        # Share of all keyword hits, scaled to the model's 1-5 confidence range
+        total_hits = sum(scores.values())
+        confidence = max(1, round(5 * best_hits / total_hits))
+        
+        return QueryIntent(
+            intent=best,
+            reasoning=f"Matched {best_hits} of {total_hits} intent keywords",
+            confidence=confidence
+        )
+    
+    def _classify_with_llm(self, query: str) -> QueryIntent:
         """
         Use Gemini to classify query intent and determine which doc types are needed.
         
@@ -94,133 +519,206 @@ class RagEngine:
         Returns:
             QueryIntent object with intent classification
         """
-        prompt = f"""Classify this employee query into ONE category based on what type of document would answer it:
-
-- "policy" - Questions about rules, permissions, procedures, what's allowed/not allowed, work requirements, benefits, HR matters, remote work, time off, company guidelines
-- "menu" - Questions about food, cafeteria, meals, dining, lunch, dinner, breakfast
-- "memo" - Questions about announcements, updates, communications, notices
-- "general" - Unclear or could need multiple document types
+        prompt = _INTENT_PROMPT.format_map({'query': query})
 
-Query: {query}
-
-Respond with ONLY the category name (policy, menu, memo, or general). Nothing else."""
-
-        try:
-            response = self.client.models.generate_content(
-                model=self.config.GEMINI_MODEL,
-                contents=prompt,
-                config={
-                    "temperature": self.config.TEMPERATURE_INTENT,
-                    "response_mime_type": "application/json",
-                    "response_json_schema": QueryIntent.model_json_schema()
-                }
-            )
+        response = self.client.models.generate_content(
+            model=self.config.GEMINI_MODEL,
+            contents=prompt,
+            config={
+                "temperature": self.config.TEMPERATURE_INTENT,
+                "response_mime_type": "text/x.enum",
+                "response_schema": DocType,
+                **self._intent_decoding(_INTENT_LABEL_TOKENS)
+            }
+        )
+        
+        result = self._intent_from_label(response.text)
+        
+        self.logger.debug(f"Query intent classified as: {result.intent}")
+        return result
+    
+    def _intent_decoding(self, label_tokens: int) -> dict:
+        """
+        Thinking and output limits for intent classification. Thinking
+        tokens count against max_output_tokens, so the cap is only set when
+        the thinking budget is known.
+        
+        Args:
+            label_tokens: Output tokens needed for the labels themselves
             
-            result = QueryIntent.model_validate_json(response.text)
+        Returns:
+            Extra generate_content config entries
+        """
+        budget = self.config.INTENT_THINKING_BUDGET
+        if budget is None:
+            return {}
+        
+        return {
+            "max_output_tokens": budget + label_tokens,
+            "thinking_config": {"thinking_budget": budget}
+        }
+    
+    def _classify_batch_with_llm(self, queries: List[str]) -> List[QueryIntent]:
+        """
+        Use Gemini to classify several queries in one request.
+        
+        Args:
+            queries: User queries
+            
+        Returns:
+            QueryIntent per query, in input order
+        """
+        numbered = "\n".join(f"{i}. {query}" for i, query in enumerate(queries, 1))
+        prompt = _INTENT_BATCH_PROMPT.format_map({'queries': numbered})
+
+        response = self.client.models.generate_content(
+            model=self.config.GEMINI_MODEL,
+            contents=prompt,
+            config={
+                "temperature": self.config.TEMPERATURE_INTENT,
+                "response_mime_type": "application/json",
+                "response_json_schema": _INTENT_LABEL_LIST_SCHEMA,
+                # Labels are single tokens, plus JSON punctuation
+                **self._intent_decoding(_INTENT_LABEL_TOKENS * (len(queries) + 1))
+            }
+        )
+        
+        results = [self._intent_from_label(label) for label in json.loads(response.text)]
+        
+        self.logger.debug(f"Classified {len(results)} queries in one request")
+        return results
+    
+    @staticmethod
+    def _intent_from_label(label: str) -> QueryIntent:
+        """
+        Wrap a bare category label from Gemini in a QueryIntent.
+        
+        Args:
+            label: Category name, e.g. "policy"
             
-            print(f"    Query intent: {result.intent}")
-            self.logger.debug(f"Query intent classified as: {result.intent} (confidence: {result.confidence})")
-            return result
+        Returns:
+            QueryIntent object with intent classification
+        
+        Raises:
+            ValueError: If the label is not a known category
+        """
+        # The label is checked against DocType, so the model needs no validation;
+        # the label carries no confidence, so the midpoint is used
+        return QueryIntent.model_construct(
+            intent=DocType(label.strip().lower()),
+            reasoning="Classified by Gemini",
+            confidence=3
+        )
+    
+    @staticmethod
+    def _metadata_columns(documents: List[Document]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Gather the metadata the filters need into parallel arrays, in a
+        single pass over the documents.
+        
+        Args:
+            documents: Retrieved documents
             
-        except Exception as e:
-            self.logger.warning(f"Intent classification failed: {e}, defaulting to 'general'")
-            print(f"    Intent classification failed: {e}, defaulting to 'general'")
-            from models import DocType
-            return QueryIntent(intent=DocType.GENERAL, reasoning="Failed to classify", confidence=1)
+        Returns:
+            Tuple of (doc_types, years, versions), indexed like documents
+        """
+        n = len(documents)
+        doc_types = np.empty(n, dtype='U8')
+        years = np.zeros(n, dtype=np.int32)
+        versions = np.zeros(n, dtype=np.int32)
+        
+        for i, doc in enumerate(documents):
+            meta = doc.metadata
+            doc_types[i] = meta.get('doc_type', '')
+            years[i] = meta.get('year', 0)
+            versions[i] = meta.get('version', 0)
+        
+        return doc_types, years, versions
     
-    def _filter_documents_by_metadata(self, documents: List[Document], query: str) -> List[Document]:
+    def _apply_intent_filter(self, documents: List[Document], intent: str) -> List[Document]:
         """
         Filter documents based on query intent and metadata.
         Returns only the most relevant and up-to-date documents.
         
         Args:
             documents: Retrieved documents
-            query: User query
+            intent: Classified query intent (policy, menu, memo, general)
             
         Returns:
             Filtered documents
         """
+        self.logger.debug(f"Filtering {len(documents)} documents for intent: {intent}")
         
-        result = self._classify_query_intent(query)
-        intent = result.intent.value
-        
-        print(f"    Documents before filtering: {len(documents)}")
-        self.logger.info(f"Filtering documents for intent: {intent}")
+        doc_types, years, versions = self._metadata_columns(documents)
         
-        if intent == 'menu':
-            filtered_docs = [d for d in documents if d.metadata.get('doc_type') == 'menu']
-            print(f"Keeping only MENU documents: {len(filtered_docs)}")
-            self.logger.debug(f"Filtered to {len(filtered_docs)} MENU documents")
-            return filtered_docs
-        
-        elif intent == 'memo':
-            filtered_docs = [d for d in documents if d.metadata.get('doc_type') == 'memo']
-            print(f"Keeping only MEMO documents: {len(filtered_docs)}")
-            self.logger.debug(f"Filtered to {len(filtered_docs)} MEMO documents")
-            return filtered_docs
+        if intent in ('menu', 'memo'):
+            chosen = np.flatnonzero(doc_types == intent)
+            self.logger.debug(f"Filtered to {len(chosen)} {intent.upper()} documents")
         
         elif intent == 'policy':
-            policy_docs = [d for d in documents if d.metadata.get('doc_type') == 'policy']
-            print(f"    Found {len(policy_docs)} policy documents")
-            self.logger.debug(f"Found {len(policy_docs)} policy documents")
-            return self._filter_latest_policy(policy_docs)
+            candidates = np.flatnonzero(doc_types == 'policy')
+            self.logger.debug(f"Found {len(candidates)} policy documents")
+            chosen = self._filter_latest_policy(documents, candidates, doc_types, years, versions)
         
         else:
-            print(f"    General query - filtering all document types")
             self.logger.debug("General query - applying policy filtering")
-            return self._filter_latest_policy(documents)
+            candidates = np.arange(len(documents))
+            chosen = self._filter_latest_policy(documents, candidates, doc_types, years, versions)
+        
+        return [documents[i] for i in chosen]
 
-    def _filter_latest_policy(self, documents: List[Document]) -> List[Document]:
+    def _filter_latest_policy(
+        self,
+        documents: List[Document],
+        candidates: np.ndarray,
+        doc_types: np.ndarray,
+        years: np.ndarray,
+        versions: np.ndarray
+    ) -> np.ndarray:
         """
         Keep only the latest version of policy documents.
         Non-policy documents pass through unchanged.
         
         Args:
-            documents: Documents to filter
+            documents: Retrieved documents, used for logging only
+            candidates: Indices of the documents to filter
+            doc_types: doc_type per document, from _metadata_columns()
+            years: year per document
+            versions: version per document
             
         Returns:
-            Filtered documents with only latest policy
+            Indices of the kept documents, latest policy first
         """
-        if not documents:
-            return []
-        
-        policy_docs = [d for d in documents if d.metadata.get('doc_type') == 'policy']
-        other_docs = [d for d in documents if d.metadata.get('doc_type') != 'policy']
+        is_policy = doc_types[candidates] == 'policy'
+        policy_idx = candidates[is_policy]
         
-        if len(policy_docs) <= 1:
-            return documents
+        if len(policy_idx) <= 1:
+            return candidates
         
-        print(f"        Multiple policies detected: {len(policy_docs)}")
-        self.logger.debug(f"Multiple policies detected: {len(policy_docs)}")
-        
-        latest_policy = None
-        latest_year = 0
-        latest_version = 0
-        
-        for doc in policy_docs:
-            year = doc.metadata.get('year', 0)
-            version = doc.metadata.get('version', 0)
-            source = doc.metadata.get('source', 'unknown')
-            
-            print(f"      - {source}: year={year}, version={version}")
-            
-            if (year > latest_year) or (year == latest_year and version > latest_version):
-                latest_policy = doc
-                latest_year = year
-                latest_version = version
-        
-        if latest_policy:
-            print(f"Keeping latest: {latest_policy.metadata.get('source')} "
-                  f"(year: {latest_year}, v{latest_version})")
-            self.logger.info(
-                f"Selected latest policy: {latest_policy.metadata.get('source')} "
-                f"(year: {latest_year}, v{latest_version})"
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                f"Multiple policies detected: " + ", ".join(
+                    f"{documents[i].metadata.get('source', 'unknown')} (year={years[i]}, v{versions[i]})"
+                    for i in policy_idx
+                )
             )
-            return [latest_policy] + other_docs
         
-        return documents
+        # Newest year, then highest version; on a tie the earlier (more similar) doc wins
+        latest = policy_idx[np.lexsort((-policy_idx, versions[policy_idx], years[policy_idx]))[-1]]
+        
+        self.logger.debug(
+            f"Selected latest policy: {documents[latest].metadata.get('source')} "
+            f"(year: {years[latest]}, v{versions[latest]})"
+        )
+        return np.concatenate(([latest], candidates[~is_policy]))
     
-    def retrieve_relevant_context(self, query: str, k: int = 5) -> List[Document]:
+    def retrieve_relevant_context(
+        self,
+        query: str,
+        k: int = 5,
+        intent: Optional[QueryIntent] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[Document]:
         """
         Main retrieval method:
         1. Retrieve top-k documents by similarity
@@ -230,21 +728,42 @@ Respond with ONLY the category name (policy, menu, memo, or general). Nothing el
         Args:
             query: User query
             k: Number of documents to retrieve initially
+            intent: Already-known intent of the query, skips classification
+            query_embedding: Already-computed embedding of the query
             
         Returns:
             Filtered documents
         """
-        print("     RETRIEVAL PHASE")
-        print("-" * 70)
-        self.logger.info(f"Starting retrieval for query: {query}")
+        self.logger.debug(f"Starting retrieval for query: {query}")
         
-        documents = self._retrieve_documents(query, k=self.config.SIMILARITY_SEARCH_K)
+        fast = intent or self._classify_without_llm(query)
         
-        filtered_docs = self._filter_documents_by_metadata(documents, query)
+        if fast is not None:
+            # Intent known up front: let Chroma filter by doc_type during the search.
+            # The smaller k only applies when a filter does; a general query
+            # searches as widely as the uncached path below
+            intent = fast.intent.value
+            filtered = intent in _FILTERABLE_DOC_TYPES
+            documents = self._retrieve_documents(
+                query,
+                k=self.config.RETRIEVAL_TOP_K if filtered else self.config.SIMILARITY_SEARCH_K,
+                doc_type=intent,
+                query_embedding=query_embedding
+            )
+        else:
+            # Intent needs Gemini: overlap the LLM call with an unfiltered search
+            search = self._executor.submit(
+                self._retrieve_documents, query, k=self.config.SIMILARITY_SEARCH_K,
+                query_embedding=query_embedding
+            )
+            classify = self._executor.submit(self._classify_query_intent, query)
+            
+            documents = search.result()
+            intent = classify.result().intent.value
         
-        print(f"    Final documents: {len(filtered_docs)}")
-        print("-" * 70 + "\n")
-        self.logger.info(f"Retrieval complete. Final documents: {len(filtered_docs)}")
+        filtered_docs = self._apply_intent_filter(documents, intent)
+        
+        self.logger.debug(f"Retrieval complete. Final documents: {len(filtered_docs)}")
         
         return filtered_docs
         
@@ -259,22 +778,70 @@ Respond with ONLY the category name (policy, menu, memo, or general). Nothing el
         Returns:
             Context string for LLM
         """
-        context_parts = []
+        # One format_map per document; keys missing from older stores fall
+        # back through _ContextFields.__missing__
+        context_parts = [None] * len(documents)
         
-        for doc in documents:
-            meta = doc.metadata
-            
-            context_parts.append(
-                f"=== Document: {meta.get('source', 'unknown')} ===\n"
-                f"Type: {meta.get('doc_type', 'unknown')}\n"
-                f"Year: {meta.get('year', 'N/A')}\n"
-                f"Version: v{meta.get('version', 'N/A')}\n"
-                f"Effective Date: {meta.get('effective_date', 'N/A')}\n\n"
-                f"Content:\n{doc.page_content}\n"
+        for i, doc in enumerate(documents):
+            context_parts[i] = _CTX_TEMPLATE.format_map(
+                _ContextFields(doc.metadata, content=doc.page_content)
             )
         
         return "\n".join(context_parts)
     
+    def _get_prompt_cache(self) -> Optional[str]:
+        """
+        Return the Gemini cached-content handle for the answer instructions,
+        creating or refreshing it when its TTL is about to run out.
+        
+        Returns:
+            Cached content name, or None if caching is disabled or unavailable
+        """
+        if not self.config.PROMPT_CACHE_ENABLED:
+            return None
+        
+        ttl = self.config.PROMPT_CACHE_TTL_SECONDS
+        
+        with self._prompt_cache_lock:
+            now = time.monotonic()
+            if now < self._prompt_cache_expires:
+                return self._prompt_cache_name
+            
+            try:
+                # A too-small prompt can never be cached; once that is known,
+                # skip the create call for the rest of the process
+                if self._prompt_cache_name is None:
+                    tokens = self.client.models.count_tokens(
+                        model=self.config.GEMINI_MODEL, contents=_ANSWER_SYSTEM_PROMPT
+                    ).total_tokens
+                    if tokens < _MIN_PROMPT_CACHE_TOKENS:
+                        self.logger.info(
+                            f"Answer instructions are {tokens} tokens, below Gemini's "
+                            f"{_MIN_PROMPT_CACHE_TOKENS}-token cache minimum; sending them inline"
+                        )
+                        self._prompt_cache_expires = float('inf')
+                        return None
+                
+                cached = self.client.caches.create(
+                    model=self.config.GEMINI_MODEL,
+                    config={
+                        "system_instruction": _ANSWER_SYSTEM_PROMPT,
+                        "ttl": f"{ttl}s"
+                    }
+                )
+            except Exception as e:
+                # Don't retry until the next refresh window
+                self.logger.info(f"Prompt cache unavailable, sending instructions inline: {e}")
+                self._prompt_cache_name = None
+                self._prompt_cache_expires = now + ttl
+                return None
+            
+            # Refresh early so requests never reference an expired cache
+            self._prompt_cache_name = cached.name
+            self._prompt_cache_expires = now + ttl * 0.9
+            self.logger.info(f"Created Gemini prompt cache: {cached.name}")
+            return self._prompt_cache_name
+    
     def _generate_answer(self, question: str, context: str) -> PolicyAnswer:
         """
         Generate answer using Gemini API.
@@ -286,37 +853,28 @@ Respond with ONLY the category name (policy, menu, memo, or general). Nothing el
         Returns:
             PolicyAnswer with structured response
         """
-        prompt = f"""You are a helpful HR assistant for TechCorp Inc.
-
-Answer the employee's question using ONLY the provided documents.
-
-1. ONLY answer if the documents contain relevant information to the question.
-2. ALWAYS prioritize the MOST RECENT policy when there are conflicts
-3. If an older policy contradicts a newer policy, the NEWER policy wins
-4. If the documents DO NOT contain information to answer the question, respond with:
-   "answer": "I don't have information about that in the company documents. I can only help with TechCorp policies, menus, and memos.", "cited_sources": []
-5. DO NOT make up information or use knowledge outside the provided documents
-6. Be direct and concise
-
-Documents:
-{context}
-
-EMPLOYEE QUESTION: {question}
-
-ANSWER (with citations):"""
+        # Only the dynamic part is sent; instructions come from the cache/system prompt
+        prompt = _ANSWER_PROMPT.format_map({'context': context, 'question': question})
         
-        print("     Generating answer with Gemini...\n")
-        self.logger.info("Generating answer with LLM")
+        self.logger.debug("Generating answer with LLM")
+        
+        generation_config = {
+            "response_mime_type": "application/json",
+            "response_json_schema": _POLICY_ANSWER_SCHEMA,
+            "temperature": self.config.TEMPERATURE_CONTENT
+        }
+        
+        cache_name = self._get_prompt_cache()
+        if cache_name:
+            generation_config["cached_content"] = cache_name
+        else:
+            generation_config["system_instruction"] = _ANSWER_SYSTEM_PROMPT
         
         try:
             response = self.client.models.generate_content(
                 model=self.config.GEMINI_MODEL,
                 contents=prompt,
-                config={
-                    "response_mime_type": "application/json",
-                    "response_json_schema": PolicyAnswer.model_json_schema(),
-                    "temperature": self.config.TEMPERATURE_CONTENT
-                }
+                config=generation_config
             )
             
             answer = PolicyAnswer.model_validate_json(response.text)
@@ -327,22 +885,74 @@ ANSWER (with citations):"""
             self.logger.error(f"Failed to generate answer: {e}")
             raise
     
-    def query(self, question: str) -> PolicyAnswer:
+    def _has_no_documents_for(self, question: str, intent: QueryIntent) -> bool:
+        """
+        Whether the question asks for a doc_type with nothing indexed, so
+        retrieval and Gemini can't help. General queries may be answered by
+        any type and always go through.
+        
+        Args:
+            question: User's question
+            intent: Intent of the question
+        
+        Returns:
+            True if the question can be answered without retrieval
+        """
+        label = intent.intent.value
+        counts = self.pipeline.doc_type_counts
+        if counts is None or label not in _FILTERABLE_DOC_TYPES or counts.get(label) != 0:
+            return False
+        
+        # Gemini and intent-cache classifications are trusted; a keyword
+        # route only when no other category's keywords matched at all
+        if self._classify_with_keywords(question) is None:
+            return True
+        hits = self._keyword_hits(question)
+        return sum(hits.values()) == hits[label]
+    
+    def query(self, question: str, intent: Optional[QueryIntent] = None) -> PolicyAnswer:
         """
         Main query method.
         
         Args:
             question: User's question
+            intent: Already-known intent of the question, skips classification
         
         Returns:
             PolicyAnswer with structured response
         """
-        print("=" * 70)
-        print(f"QUERY: {question}")
-        print("=" * 70 + "\n")
         self.logger.info(f"Processing query: {question}")
         
-        relevant_docs = self.retrieve_relevant_context(question, k=self.config.RETRIEVAL_TOP_K)
+        if intent is None:
+            intent = self._classify_without_llm(question)
+        
+        if intent is not None and self._has_no_documents_for(question, intent):
+            self.logger.info(f"No {intent.intent.value} documents indexed, skipping retrieval")
+            return PolicyAnswer(
+                answer=_NO_INFORMATION_ANSWER,
+                reasoning=f"No {intent.intent.value} documents are available",
+                cited_sources=[],
+                policy_allows_remote=None
+            )
+        
+        # Embedded once, shared by the semantic cache and the vector search
+        query_embedding = None
+        try:
+            query_embedding = self.pipeline.embedding.embed_query(question)
+        except Exception as e:
+            self.logger.warning(f"Query embedding failed, bypassing cache: {e}")
+        
+        if self.cache is not None and query_embedding is not None:
+            cached = self.cache.lookup(query_embedding)
+            if cached is not None:
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(f"Semantic cache hit ({self.cache.stats()})")
+                return cached
+        
+        relevant_docs = self.retrieve_relevant_context(
+            question, k=self.config.RETRIEVAL_TOP_K, intent=intent,
+            query_embedding=query_embedding
+        )
         
         if not relevant_docs:
             self.logger.warning("No relevant documents found")
@@ -356,9 +966,46 @@ ANSWER (with citations):"""
         context = self._build_context(relevant_docs)
         
         answer = self._generate_answer(question, context)
-
-        print("\n   Generated answer")
+        
+        if self.cache is not None and query_embedding is not None:
+            self.cache.add(query_embedding, answer)
+        
         return answer
+    
+    def query_batch(self, questions: List[str]) -> List[Union[PolicyAnswer, Exception]]:
+        """
+        Answer several questions at once. Intents are classified in a single
+        Gemini request, then the questions are answered concurrently.
+        A question that fails doesn't fail the batch: its exception is
+        returned in its place.
+        
+        Args:
+            questions: User questions
+        
+        Returns:
+            PolicyAnswer, or the exception raised while answering, per
+            question in input order
+        """
+        if not questions:
+            return []
+        
+        self.logger.info(f"Processing batch of {len(questions)} queries")
+        
+        intents = self._classify_query_intents(questions)
+        
+        # Bounded separately from self._executor so retrieval work isn't starved
+        max_workers = min(self.config.MAX_CONCURRENT_LLM, len(questions))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rag-batch") as pool:
+            futures = [pool.submit(self.query, q, intent) for q, intent in zip(questions, intents)]
+        
+        results = []
+        for question, future in zip(questions, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                self.logger.error(f"Failed to answer '{question}': {e}")
+                results.append(e)
+        return results
 
 
 # ============================================================================
@@ -367,7 +1014,7 @@ ANSWER (with citations):"""
 
 if __name__ == "__main__":
     try:
-        config = Config()
+        config = get_config()
         
         rag = RagEngine(config)
         
@@ -0,0 +1,319 @@
+"""
+Semantic Query Cache
+Reuses answers for questions whose embeddings are near-duplicates of earlier ones
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+
+from models import PolicyAnswer
+
+# Persisted cache files, inside the cache directory
+EMBEDDINGS_FILENAME = "embeddings.f16"
+ANSWERS_FILENAME = "answers.sqlite3"
+
+# Rows scored per matrix-vector product during lookup; keeps each block cache-resident
+LOOKUP_BLOCK_ROWS = 4096
+
+
+class SemanticCache:
+    """
+    Cache of PolicyAnswers keyed by query embedding.
+    Embeddings are stored L2-normalized as float16 rows of a fixed-capacity
+    matrix, so a lookup is a matrix-vector product whose scores are cosine
+    similarities. Entries expire after a TTL and the least recently used
+    entry is replaced once the cache is full.
+
+    With a path, the matrix is a memory-mapped file and the answers live in
+    a SQLite sidecar keyed by row, so the cache survives restarts.
+
+    Answers depend on the indexed documents, so the cache is bound to a
+    fingerprint of the vector store and emptied whenever that changes.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        path: Optional[Union[str, Path]] = None
+    ):
+        """
+        Initialize semantic cache.
+
+        Args:
+            max_size: Maximum number of cached answers
+            threshold: Minimum cosine similarity for a cache hit
+            ttl_seconds: Seconds before a cached answer expires
+            path: Directory to persist the cache in; in-memory only if None
+        """
+        self.max_size = max_size
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.path = Path(path).expanduser() if path else None
+
+        self._lock = threading.RLock()
+        # Created on the first add, once the embedding dimension is known
+        self._embeddings: Optional[np.ndarray] = None
+        self._valid = np.zeros(max_size, dtype=bool)
+        self._created = np.zeros(max_size, dtype=np.float64)
+        self._last_used = np.zeros(max_size, dtype=np.float64)
+        # Answers loaded from disk stay JSON until they are first hit
+        self._answers: List[Union[PolicyAnswer, str, None]] = [None] * max_size
+        self._db: Optional[sqlite3.Connection] = None
+        # Fingerprint of the vector store the answers came from
+        self._store: Optional[str] = None
+
+        self.hits = 0
+        self.misses = 0
+
+        if self.path is not None:
+            self._open()
+
+    def __len__(self) -> int:
+        return int(self._valid.sum())
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """L2-normalize an embedding so dot products are cosine similarities."""
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    # ========================================================================
+    # PERSISTENCE
+    # ========================================================================
+
+    def _open(self):
+        """Open the SQLite sidecar and map the saved embeddings, if compatible."""
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self._db = sqlite3.connect(
+            self.path / ANSWERS_FILENAME, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "slot INTEGER PRIMARY KEY, answer TEXT NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        dim, capacity = meta.get('dim'), meta.get('capacity')
+        self._store = meta.get('store')
+        embeddings_file = self.path / EMBEDDINGS_FILENAME
+
+        if dim is None or capacity != self.max_size or not embeddings_file.exists() \
+                or embeddings_file.stat().st_size != capacity * dim * 2:
+            # Nothing saved yet, or saved with a different max_size
+            self._reset_files()
+            return
+
+        self._embeddings = np.memmap(
+            embeddings_file, dtype=np.float16, mode='r+', shape=(capacity, dim)
+        )
+
+        cutoff = time.time() - self.ttl_seconds
+        self._db.execute("DELETE FROM entries WHERE created < ?", (cutoff,))
+        for slot, answer, created, last_used in self._db.execute(
+            "SELECT slot, answer, created, last_used FROM entries"
+        ):
+            self._valid[slot] = True
+            self._answers[slot] = answer
+            self._created[slot] = created
+            self._last_used[slot] = last_used
+
+    def _reset_files(self):
+        """Drop any saved cache state."""
+        self._db.execute("DELETE FROM entries")
+        self._db.execute("DELETE FROM meta")
+        (self.path / EMBEDDINGS_FILENAME).unlink(missing_ok=True)
+        self._store = None
+
+    def _drop_all(self):
+        """
+        Forget every entry along with the embedding matrix and its files, so
+        the next add allocates it afresh. The store binding is kept. Caller
+        must hold the lock.
+        """
+        store = self._store
+        self._valid[:] = False
+        self._answers = [None] * self.max_size
+        # Unmapped before its file is removed
+        self._embeddings = None
+
+        if self.path is not None:
+            if self._db is not None:
+                self._db.close()
+            (self.path / ANSWERS_FILENAME).unlink(missing_ok=True)
+            self._open()
+        self._set_store(store)
+
+    def _set_store(self, fingerprint: Optional[str]):
+        """Record the bound vector store. Caller must hold the lock."""
+        self._store = fingerprint
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('store', ?)", (fingerprint,)
+            )
+
+    def _allocate(self, dim: int):
+        """Create the embedding matrix on the first add. Caller must hold the lock."""
+        if self.path is None:
+            self._embeddings = np.zeros((self.max_size, dim), dtype=np.float16)
+            return
+
+        self._embeddings = np.memmap(
+            self.path / EMBEDDINGS_FILENAME, dtype=np.float16,
+            mode='w+', shape=(self.max_size, dim)
+        )
+        self._db.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [('dim', dim), ('capacity', self.max_size)]
+        )
+
+    def bind(self, fingerprint: Optional[str]):
+        """
+        Tie the cache to a vector store. Answers cached against a different
+        store, or against one whose contents are unknown, are dropped.
+
+        Args:
+            fingerprint: Fingerprint of the loaded vector store, or None if unknown
+        """
+        with self._lock:
+            # A rebuild may have deleted the files out from under an open cache
+            files_lost = self.path is not None and not (self.path / ANSWERS_FILENAME).exists()
+            if fingerprint is None or fingerprint != self._store or files_lost:
+                self._drop_all()
+            self._set_store(fingerprint)
+
+    def close(self):
+        """Flush the embedding file and close the SQLite sidecar."""
+        with self._lock:
+            if isinstance(self._embeddings, np.memmap):
+                self._embeddings.flush()
+            if self._db is not None:
+                # Persist recency so LRU order survives the restart
+                self._db.executemany(
+                    "UPDATE entries SET last_used = ? WHERE slot = ?",
+                    [(float(self._last_used[i]), int(i)) for i in np.flatnonzero(self._valid)]
+                )
+                self._db.close()
+                self._db = None
+
+    # ========================================================================
+    # CACHE OPERATIONS
+    # ========================================================================
+
+    def _expire(self, now: float):
+        """Drop entries older than the TTL. Caller must hold the lock."""
+        expired = self._valid & (now - self._created > self.ttl_seconds)
+        if not expired.any():
+            return
+
+        self._valid[expired] = False
+        for slot in np.flatnonzero(expired):
+            self._answers[slot] = None
+        if self._db is not None:
+            self._db.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl_seconds,))
+
+    def lookup(self, embedding: List[float]) -> Optional[PolicyAnswer]:
+        """
+        Find a cached answer for a semantically equivalent query.
+
+        Args:
+            embedding: Query embedding
+
+        Returns:
+            Cached PolicyAnswer, or None on a miss
+        """
+        query_vec = self._normalize(embedding)
+        now = time.time()
+
+        with self._lock:
+            self._expire(now)
+
+            if not self._valid.any() or self._embeddings.shape[1] != query_vec.shape[0]:
+                self.misses += 1
+                return None
+
+            sims = np.empty(self.max_size, dtype=np.float32)
+            for start in range(0, self.max_size, LOOKUP_BLOCK_ROWS):
+                block = self._embeddings[start:start + LOOKUP_BLOCK_ROWS]
+                sims[start:start + len(block)] = block.astype(np.float32) @ query_vec
+            sims[~self._valid] = -np.inf
+
+            best = int(np.argmax(sims))
+
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._last_used[best] = now
+
+            answer = self._answers[best]
+            if isinstance(answer, str):
+                answer = self._answers[best] = PolicyAnswer.model_validate_json(answer)
+            return answer
+
+    def add(self, embedding: List[float], answer: PolicyAnswer):
+        """
+        Cache an answer under its query embedding.
+
+        Args:
+            embedding: Query embedding
+            answer: Answer generated for the query
+        """
+        query_vec = self._normalize(embedding)
+        now = time.time()
+
+        with self._lock:
+            self._expire(now)
+
+            if self._embeddings is not None and self._embeddings.shape[1] != query_vec.shape[0]:
+                # The embedding model changed; no cached row can match any more
+                self._drop_all()
+            if self._embeddings is None:
+                self._allocate(query_vec.shape[0])
+
+            if self._valid.all():
+                slot = int(np.argmin(self._last_used))
+            else:
+                slot = int(np.argmin(self._valid))
+
+            # Embedding first: a row without an entries record is never read
+            self._embeddings[slot] = query_vec
+            self._valid[slot] = True
+            self._answers[slot] = answer
+            self._created[slot] = now
+            self._last_used[slot] = now
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (slot, answer, created, last_used) "
+                    "VALUES (?, ?, ?, ?)",
+                    (slot, answer.model_dump_json(), now, now)
+                )
+
+    def clear(self):
+        """Remove all cached answers, along with their saved files, and reset counters."""
+        with self._lock:
+            self._drop_all()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Cache statistics.
+
+        Returns:
+            Dict with size, hits and misses
+        """
+        with self._lock:
+            return {"size": len(self), "hits": self.hits, "misses": self.misses}